@@ -1,12 +1,100 @@
 # agents.py
 
 from abc import ABC, abstractmethod
+import logging
 import random
 import heapq
+import numpy as np
 from typing import Dict, List, Set, Tuple, Optional
 
 # وارد کردن کلاس‌های داده‌ای مورد نیاز از ماژول مشترک
-from common import Action, Perception, Position, Direction, CellType, PlanStep
+from common import Action, Perception, Position, Direction, CellType, PlanStep, DIR_TO_ACTION, ACTION_TO_DIR
+from astar_numba import NUMBA_AVAILABLE, astar
+
+logger = logging.getLogger(__name__)
+
+# بردار جابه‌جایی و اقدام حرکتی هر جهت به ترتیب اعضای Direction (همان کدهای جهت هسته numba)
+_DIR_VECTORS = tuple(direction.value for direction in Direction)
+_DIR_ACTIONS = tuple(DIR_TO_ACTION[direction] for direction in Direction)
+_DIR_MOVES = tuple(zip(_DIR_VECTORS, _DIR_ACTIONS))
+
+# خانه‌هایی که حرکت تصادفی نباید به سمت آن‌ها انجام شود
+_BLOCKING_CELLS = (CellType.WALL, CellType.HAZARD)
+
+
+# کلید صف A* به صورت یک عدد صحیح فشرده است: priority<<40 | counter<<20 | y<<10 | x
+# مختصات با یک بایاس ذخیره می‌شوند تا خانه‌های منفی (بیرون از شبکه) هم در ۱۰ بیت جا شوند.
+_COORD_BIAS = 512
+_COORD_MASK = 0x3ff
+
+# حداکثر تعداد مسیرهای ذخیره‌شده در حافظه نهان A* هر عامل
+_PATH_CACHE_SIZE = 128
+
+# سقف تعداد گره‌های بازشده در A* (برای هر دو پیاده‌سازی پایتونی و numba)
+_ASTAR_ITER_LIMIT = 200
+
+
+def _astar_bounds(start: Position, goal: Position, walls: Set[Position]) -> Tuple[int, int, int, int]:
+    """
+    کادر جستجوی A* را به صورت (min_x, min_y, max_x, max_y) برمی‌گرداند: دیوارهای شناخته‌شده، شروع و هدف
+    با یک خانه حاشیه آزاد، چون خانه‌های ناشناخته آزاد فرض می‌شوند. هر دو پیاده‌سازی A* فقط داخل این کادر جستجو می‌کنند.
+    بیرون از کادر دیواری نیست، پس هر مسیر بیرون‌زده را می‌توان بدون افزایش طول به حاشیه کادر برگرداند؛
+    کادر هیچ کوتاه‌ترین مسیری را حذف نمی‌کند و فقط گسترش گره‌های بی‌فایده زیر سقف تکرار را کم می‌کند.
+    """
+    xs = [p.x for p in walls] + [start.x, goal.x]
+    ys = [p.y for p in walls] + [start.y, goal.y]
+    min_x, min_y, max_x, max_y = min(xs) - 1, min(ys) - 1, max(xs) + 1, max(ys) + 1
+    # هر مختصات در کلید فشرده صف A* فقط ۱۰ بیت دارد؛ مقدار بیرون از این بازه فیلد کناری را خراب می‌کند
+    if min(min_x, min_y) < -_COORD_BIAS or max(max_x, max_y) > _COORD_MASK - _COORD_BIAS:
+        raise ValueError(f"A* search box ({min_x}, {min_y})-({max_x}, {max_y}) exceeds the packed coordinate "
+                         f"range [{-_COORD_BIAS}, {_COORD_MASK - _COORD_BIAS}]")
+    return min_x, min_y, max_x, max_y
+
+
+class SpatialHash:
+    """
+    شاخص مکانی سطلی برای یافتن نزدیک‌ترین موقعیت (فاصله منهتن).
+    موقعیت‌ها در سطل‌های bucket_size×bucket_size نگهداری می‌شوند و جستجو حلقه به حلقه از سطل مبدأ گسترش می‌یابد.
+    """
+
+    def __init__(self, bucket_size: int = 8):
+        self.bucket_size = bucket_size
+        self._buckets: Dict[Tuple[int, int], List[Position]] = {}
+
+    def add(self, pos: Position):
+        self._buckets.setdefault((pos.x // self.bucket_size, pos.y // self.bucket_size), []).append(pos)
+
+    def remove(self, pos: Position):
+        key = (pos.x // self.bucket_size, pos.y // self.bucket_size)
+        bucket = self._buckets[key]
+        bucket.remove(pos)
+        if not bucket:
+            del self._buckets[key]
+
+    def nearest(self, pos: Position) -> Optional[Position]:
+        if not self._buckets: return None
+        size = self.bucket_size
+        bx, by = pos.x // size, pos.y // size
+        max_ring = max(max(abs(kx - bx), abs(ky - by)) for kx, ky in self._buckets)
+
+        best, best_dist = None, 0
+        for ring in range(max_ring + 1):
+            # هر خانه در حلقه ring دست‌کم (ring - 1) * size + 1 خانه با مبدأ فاصله دارد
+            if best is not None and (ring - 1) * size + 1 > best_dist:
+                break
+            if ring == 0:
+                keys = [(bx, by)]
+            else:
+                keys = [(bx + d, by - ring) for d in range(-ring, ring + 1)]
+                keys += [(bx + d, by + ring) for d in range(-ring, ring + 1)]
+                keys += [(bx - ring, by + d) for d in range(-ring + 1, ring)]
+                keys += [(bx + ring, by + d) for d in range(-ring + 1, ring)]
+            for key in keys:
+                for p in self._buckets.get(key, ()):
+                    dist = abs(p.x - pos.x) + abs(p.y - pos.y)
+                    if best is None or dist < best_dist:
+                        best, best_dist = p, dist
+        return best
 
 
 class Agent(ABC):
@@ -18,22 +106,64 @@ class Agent(ABC):
     def __init__(self, name: str):
         self.name = name
         self.agent_id: int = -1
-        self.action_history: List[Action] = []
-        # مقدار اولیه انرژی را روی ۱۰۰ تنظیم می‌کنیم
-        self.total_rewards: float = 100.0
-        # برای تحلیل رفتار، تعداد فعال‌سازی هر قانون را می‌شماریم
-        self.rule_activations: Dict[str, int] = {}
+        # وضعیت هر اجرا فقط در reset تعریف می‌شود تا عامل تازه ساخته‌شده بدون فراخوانی دوباره reset آماده باشد
+        self.reset()
 
     @abstractmethod
     def decide_action(self, perception: Perception) -> Tuple[Action, str]:
         """این متد باید توسط هر کلاس فرزند پیاده‌سازی شود تا تصمیم بگیرد چه اقدامی انجام دهد."""
         pass
 
+    @property
+    def action_history(self) -> List[Action]:
+        """تاریخچه اقدامات ثبت‌شده به صورت لیست (فقط برای خواندن و تحلیل)."""
+        return [Action(value) for value in self._history_buf[:self._history_len].tolist()]
+
+    def record_action(self, action: Action):
+        """یک اقدام را به تاریخچه اضافه می‌کند و در صورت پر شدن، بافر را دو برابر می‌کند."""
+        if self._history_len == len(self._history_buf):
+            grown = np.empty(2 * len(self._history_buf), dtype=np.int8)
+            grown[:self._history_len] = self._history_buf
+            self._history_buf = grown
+        self._history_buf[self._history_len] = action
+        self._history_len += 1
+
+    def last_action(self) -> Optional[Action]:
+        """آخرین اقدام ثبت‌شده در تاریخچه را برمی‌گرداند."""
+        return Action(self._history_buf[self._history_len - 1]) if self._history_len else None
+
+    def set_random_pool(self, pool: np.ndarray):
+        """مجموعه‌ای از اعداد تصادفی از پیش تولیدشده را برای تصمیم‌های تصادفی این اجرا تنظیم می‌کند."""
+        # تبدیل به لیست تا خواندن تک‌تک اعداد بدون ساختن اسکالر numpy انجام شود
+        self._random_pool = pool.tolist()
+        self._random_idx = 0
+
+    def _next_uniform(self) -> float:
+        """عدد تصادفی بعدی در [0, 1) را از مجموعه از پیش تولیدشده برمی‌دارد."""
+        pool = self._random_pool
+        if pool is None or self._random_idx >= len(pool):
+            return random.random()
+        u = pool[self._random_idx]
+        self._random_idx += 1
+        return u
+
     def reset(self):
-        """وضعیت داخلی عامل را برای یک اجرای جدید ریست می‌کند."""
-        self.action_history.clear()
-        self.total_rewards = 100.0
-        self.rule_activations.clear()
+        """
+        وضعیت داخلی عامل را برای یک اجرای جدید ریست می‌کند.
+        ظرف‌های قابل تغییر از نو ساخته می‌شوند تا هیچ وضعیتی از اجرای قبلی با اجرای جدید شریک نباشد.
+        """
+        # تاریخچه اقدامات در یک بافر int8 از پیش تخصیص‌یافته با اشاره‌گر نوشتن نگهداری می‌شود
+        self._history_buf = np.empty(4096, dtype=np.int8)
+        self._history_len = 0
+        # وضعیت حمل منبع به جای شمارش PICKUP/DROP در تاریخچه نگهداری می‌شود
+        self.carrying: bool = False
+        # مقدار اولیه انرژی را روی ۱۰۰ تنظیم می‌کنیم
+        self.total_rewards: float = 100.0
+        # برای تحلیل رفتار، تعداد فعال‌سازی هر قانون را می‌شماریم
+        self.rule_activations: Dict[str, int] = {}
+        # اعداد تصادفی از پیش تولیدشده در [0, 1) که با یک شمارنده مصرف می‌شوند (در صورت نبود، از random استفاده می‌شود)
+        self._random_pool: Optional[List[float]] = None
+        self._random_idx = 0
 
 
 class SimpleReflexAgent(Agent):
@@ -44,25 +174,32 @@ class SimpleReflexAgent(Agent):
     def decide_action(self, perception: Perception) -> Tuple[Action, str]:
         my_pos = perception.position
         visible_cells = perception.visible_cells
+        # در صورت وجود، پنجره دید مستقیماً استفاده می‌شود؛ خانه مرکزی [r, r] موقعیت خود عامل است
+        window = perception.visible_window
+        if window is None:
+            here = visible_cells.get(my_pos)
+        else:
+            r = window.shape[0] // 2
+            here = window[r, r]
 
         # قوانین با اولویت بالا
-        if perception.has_resource and visible_cells.get(my_pos) == CellType.GOAL:
+        if perception.has_resource and here == CellType.GOAL.value:
             return Action.DROP, "Rule 2.5: On goal with resource, dropping."
 
-        if not perception.has_resource and visible_cells.get(my_pos) == CellType.RESOURCE:
+        if not perception.has_resource and here == CellType.RESOURCE.value:
             return Action.PICKUP, "Rule 2: On a resource, picking up."
 
         # قوانین حرکتی
         if perception.has_resource:
-            goal_positions = [pos for pos, cell_type in visible_cells.items() if cell_type == CellType.GOAL]
-            if goal_positions:
-                direction = self._get_direction_toward(my_pos, goal_positions[0])
+            goal_pos = self._first_visible(perception, CellType.GOAL)
+            if goal_pos is not None:
+                direction = self._get_direction_toward(my_pos, goal_pos)
                 if direction:
                     return self._direction_to_action(direction), "Rule 3: Carrying resource, moving toward goal."
         else:
-            resource_positions = [pos for pos, cell_type in visible_cells.items() if cell_type == CellType.RESOURCE]
-            if resource_positions:
-                direction = self._get_direction_toward(my_pos, resource_positions[0])
+            resource_pos = self._first_visible(perception, CellType.RESOURCE)
+            if resource_pos is not None:
+                direction = self._get_direction_toward(my_pos, resource_pos)
                 if direction:
                     return self._direction_to_action(direction), "Rule 4: Seeking resource, moving toward it."
 
@@ -70,6 +207,22 @@ class SimpleReflexAgent(Agent):
         action = self._random_valid_move(visible_cells, my_pos)
         return action, "Rule 5: Random exploration."
 
+    def _first_visible(self, perception: Perception, cell_type: CellType) -> Optional[Position]:
+        """
+        اولین خانه قابل مشاهده از نوع داده‌شده را به ترتیب سطری برمی‌گرداند.
+        (argwhere به ترتیب سطری است، پس اولین خانه پنجره همان اولین خانه دیکشنری دید است)
+        """
+        window = perception.visible_window
+        if window is None:
+            return next((pos for pos, cell in perception.visible_cells.items() if cell == cell_type), None)
+        cells = np.argwhere(window == cell_type.value)
+        if not len(cells):
+            return None
+        r = window.shape[0] // 2
+        row, col = cells[0].tolist()
+        pos = perception.position
+        return Position(pos.x + col - r, pos.y + row - r)
+
     def _get_direction_toward(self, from_pos: Position, to_pos: Position) -> Optional[Direction]:
         if from_pos.y > to_pos.y: return Direction.NORTH
         if from_pos.y < to_pos.y: return Direction.SOUTH
@@ -78,15 +231,16 @@ class SimpleReflexAgent(Agent):
         return None
 
     def _direction_to_action(self, direction: Direction) -> Action:
-        return Action[f"MOVE_{direction.name}"]
+        return DIR_TO_ACTION[direction]
 
     def _random_valid_move(self, visible_cells: Dict[Position, CellType], current_pos: Position) -> Action:
         valid_moves = []
-        for direction in Direction:
-            next_pos = current_pos + direction
-            if visible_cells.get(next_pos) not in [CellType.WALL, CellType.HAZARD]:
-                valid_moves.append(self._direction_to_action(direction))
-        return random.choice(valid_moves) if valid_moves else Action.WAIT
+        for (dx, dy), action in _DIR_MOVES:
+            if visible_cells.get((current_pos.x + dx, current_pos.y + dy)) not in _BLOCKING_CELLS:
+                valid_moves.append(action)
+        if not valid_moves:
+            return Action.WAIT
+        return valid_moves[int(self._next_uniform() * len(valid_moves))]
 
 
 class ModelBasedReflexAgent(Agent):
@@ -94,10 +248,6 @@ class ModelBasedReflexAgent(Agent):
     عامل واکنش‌گر مبتنی بر مدل که یک حافظه داخلی از محیط را نگهداری می‌کند.
     """
 
-    def __init__(self, name: str):
-        super().__init__(name)
-        self.reset()
-
     def reset(self):
         super().reset()
         self.visited_positions: Set[Position] = set()
@@ -105,6 +255,9 @@ class ModelBasedReflexAgent(Agent):
         self.known_resources: Set[Position] = set()
         self.known_goals: Set[Position] = set()
         self.known_hazards: Set[Position] = set()
+        # شاخص‌های مکانی اهداف و منابع شناخته‌شده برای یافتن سریع نزدیک‌ترین آن‌ها
+        self._goal_index = SpatialHash()
+        self._res_index = SpatialHash()
 
         # در فایل agents.py، داخل کلاس ModelBasedReflexAgent
 
@@ -114,16 +267,21 @@ class ModelBasedReflexAgent(Agent):
             if cell_type == CellType.WALL:
                 self.known_walls.add(pos)
             elif cell_type == CellType.RESOURCE:
-                self.known_resources.add(pos)
+                if pos not in self.known_resources:
+                    self.known_resources.add(pos)
+                    self._res_index.add(pos)
             elif cell_type == CellType.GOAL:
-                self.known_goals.add(pos)
+                if pos not in self.known_goals:
+                    self.known_goals.add(pos)
+                    self._goal_index.add(pos)
             elif cell_type == CellType.HAZARD:
                 self.known_hazards.add(pos)
 
         # [تغییر کلیدی] - ابتدا بررسی می‌کنیم که لیست تاریخچه خالی نباشد
-        if self.action_history and perception.position in self.known_resources and \
-                not perception.has_resource and self.action_history[-1] == Action.PICKUP:
+        if perception.position in self.known_resources and \
+                not perception.has_resource and self.last_action() == Action.PICKUP:
             self.known_resources.remove(perception.position)
+            self._res_index.remove(perception.position)
 
     def decide_action(self, perception: Perception) -> Tuple[Action, str]:
         self._update_world_model(perception)
@@ -137,14 +295,14 @@ class ModelBasedReflexAgent(Agent):
             return Action.PICKUP, "Rule 2: On a resource, picking up"
 
         if perception.has_resource and self.known_goals:
-            closest_goal = self._find_closest_target(my_pos, self.known_goals)
+            closest_goal = self._goal_index.nearest(my_pos)
             if closest_goal:
                 direction = self._get_direction_toward(my_pos, closest_goal)
                 if direction:
                     return self._direction_to_action(direction), f"Rule 4: Moving toward known goal at {closest_goal}"
 
         if not perception.has_resource and self.known_resources:
-            closest_resource = self._find_closest_target(my_pos, self.known_resources)
+            closest_resource = self._res_index.nearest(my_pos)
             if closest_resource:
                 direction = self._get_direction_toward(my_pos, closest_resource)
                 if direction:
@@ -154,10 +312,6 @@ class ModelBasedReflexAgent(Agent):
         # اکتشاف هوشمند
         return self._intelligent_exploration(perception)
 
-    def _find_closest_target(self, start_pos: Position, targets: Set[Position]) -> Optional[Position]:
-        if not targets: return None
-        return min(targets, key=lambda p: abs(p.x - start_pos.x) + abs(p.y - start_pos.y))
-
     def _intelligent_exploration(self, perception: Perception) -> Tuple[Action, str]:
         # این یک نسخه ساده از اکتشاف است، می‌توان آن را بسیار هوشمندتر کرد
         return self._random_valid_move(perception.visible_cells, perception.position), "Rule 6: Intelligent exploration"
@@ -173,17 +327,22 @@ class GoalBasedAgent(Agent):
     عامل مبتنی بر هدف که با استفاده از الگوریتم A* برنامه‌ریزی می‌کند.
     """
 
-    def __init__(self, name: str):
-        super().__init__(name)
-        self.reset()
-
     def reset(self):
         super().reset()
         self.current_plan: List[PlanStep] = []
+        # موقعیتی که عامل پس از اجرای هر گام باقی‌مانده برنامه در آن قرار می‌گیرد (هم‌تراز با current_plan)
+        self._plan_positions: List[Position] = []
+        # با کشف دیوار جدید فعال می‌شود تا اعتبار برنامه فعلی دوباره بررسی شود
+        self._plan_dirty = False
+        # نسخه دیوارهای شناخته‌شده که با هر دیوار جدید افزایش می‌یابد و کلید حافظه نهان مسیرها است
+        self._walls_version = 0
+        self._path_cache: Dict[Tuple[Position, Position, int], List[Action]] = {}
         self.visited_positions: Set[Position] = set()
         self.known_walls: Set[Position] = set()
         self.known_resources: Set[Position] = set()
         self.known_goals: Set[Position] = set()
+        self._goal_index = SpatialHash()
+        self._res_index = SpatialHash()
 
         # در فایل agents.py، داخل کلاس GoalBasedAgent
 
@@ -191,26 +350,42 @@ class GoalBasedAgent(Agent):
         self.visited_positions.add(perception.position)
         for pos, cell_type in perception.visible_cells.items():
             if cell_type == CellType.WALL:
-                self.known_walls.add(pos)
+                if pos not in self.known_walls:
+                    self.known_walls.add(pos)
+                    self._walls_version += 1
+                    self._plan_dirty = True
             elif cell_type == CellType.RESOURCE:
-                self.known_resources.add(pos)
+                if pos not in self.known_resources:
+                    self.known_resources.add(pos)
+                    self._res_index.add(pos)
             elif cell_type == CellType.GOAL:
-                self.known_goals.add(pos)
+                if pos not in self.known_goals:
+                    self.known_goals.add(pos)
+                    self._goal_index.add(pos)
 
         # [تغییر کلیدی] - اینجا هم شرط ایمنی را اضافه می‌کنیم
-        if self.action_history and perception.position in self.known_resources and \
-                not perception.has_resource and self.action_history[-1] == Action.PICKUP:
+        if perception.position in self.known_resources and \
+                not perception.has_resource and self.last_action() == Action.PICKUP:
             self.known_resources.remove(perception.position)
+            self._res_index.remove(perception.position)
 
     def decide_action(self, perception: Perception) -> Tuple[Action, str]:
         self._update_world_model(perception)
         my_pos = perception.position
 
+        # اگر دیوار تازه کشف‌شده روی مسیر باقی‌مانده باشد، برنامه کنار گذاشته و دوباره ساخته می‌شود
+        if self._plan_dirty:
+            self._plan_dirty = False
+            if any(p in self.known_walls for p in self._plan_positions):
+                self.current_plan.clear()
+                self._plan_positions.clear()
+
         if not self.current_plan:
             self._create_new_plan(perception)
 
         if self.current_plan:
             next_step = self.current_plan.pop(0)
+            self._plan_positions.pop(0)
             return next_step.action, f"Executing plan: {next_step.action.name}"
 
         # اگر هیچ برنامه‌ای وجود ندارد، به صورت اکتشافی حرکت کن
@@ -219,90 +394,126 @@ class GoalBasedAgent(Agent):
 
     def _create_new_plan(self, perception: Perception):
         my_pos = perception.position
-        goals = []
 
+        # مطلوبیت هر هدف به صورت 20/(d+1) یا 10/(d+1) است، پس بهترین هدف همان نزدیک‌ترین هدف است
         if perception.has_resource and self.known_goals:
-            for goal_pos in self.known_goals:
-                dist = abs(my_pos.x - goal_pos.x) + abs(my_pos.y - goal_pos.y)
-                goals.append({"type": "DELIVER", "pos": goal_pos, "utility": 20.0 / (dist + 1)})
+            best_goal = {"type": "DELIVER", "pos": self._goal_index.nearest(my_pos)}
         elif not perception.has_resource and self.known_resources:
-            for res_pos in self.known_resources:
-                dist = abs(my_pos.x - res_pos.x) + abs(my_pos.y - res_pos.y)
-                goals.append({"type": "COLLECT", "pos": res_pos, "utility": 10.0 / (dist + 1)})
-
-        if not goals: return  # هیچ هدف ممکنی وجود ندارد
+            best_goal = {"type": "COLLECT", "pos": self._res_index.nearest(my_pos)}
+        else:
+            return  # هیچ هدف ممکنی وجود ندارد
 
-        best_goal = max(goals, key=lambda g: g['utility'])
-        path_actions = self._find_path_astar(my_pos, best_goal["pos"], self.known_walls)
+        # دیوارها قابل تغییر هستند، پس به جای lru_cache از یک دیکشنری با کلید نسخه دیوارها استفاده می‌شود
+        cache_key = (my_pos, best_goal["pos"], self._walls_version)
+        path_actions = self._path_cache.get(cache_key)
+        if path_actions is None:
+            path_actions = self._find_path_astar(my_pos, best_goal["pos"], self.known_walls)
+            if len(self._path_cache) >= _PATH_CACHE_SIZE:
+                del self._path_cache[next(iter(self._path_cache))]  # حذف قدیمی‌ترین مسیر
+            self._path_cache[cache_key] = path_actions
 
         if path_actions:
             self.current_plan = [PlanStep(action=act) for act in path_actions]
             final_action = Action.PICKUP if best_goal["type"] == "COLLECT" else Action.DROP
             self.current_plan.append(PlanStep(action=final_action))
-            print(f"Agent {self.agent_id} created a new plan: {best_goal['type']} at {best_goal['pos']}")
+
+            self._plan_positions = []
+            pos = my_pos
+            for act in path_actions:
+                pos = pos + ACTION_TO_DIR[act]
+                self._plan_positions.append(pos)
+            self._plan_positions.append(pos)  # گام پایانی (برداشتن یا رها کردن) در همان خانه هدف است
+            logger.debug("Agent %s created a new plan: %s at %s", self.agent_id, best_goal['type'], best_goal['pos'])
 
         # در فایل agents.py، داخل کلاس GoalBasedAgent
 
     def _find_path_astar(self, start: Position, goal: Position, walls: Set[Position]) -> List[Action]:
+        """الگوریتم A*؛ در صورت وجود numba از هسته کامپایل‌شده و در غیر این صورت از نسخه پایتونی استفاده می‌شود."""
+        if NUMBA_AVAILABLE:
+            return self._find_path_astar_numba(start, goal, walls)
+        return self._find_path_astar_python(start, goal, walls)
+
+    @staticmethod
+    def _find_path_astar_python(start: Position, goal: Position, walls: Set[Position]) -> List[Action]:
         """الگوریتم A* با یک گره‌گشا برای جلوگیری از خطای مقایسه."""
+        # گره‌ها به صورت تاپل ساده (x, y) نگهداری می‌شوند که با Position هم‌ارز است و ساخت آن ارزان‌تر است
+        gx, gy = goal
+        min_x, min_y, max_x, max_y = _astar_bounds(start, goal, walls)
 
-        def heuristic(a: Position, b: Position) -> int:
-            return abs(a.x - b.x) + abs(a.y - b.y)
+        # چون هدف در طول جستجو ثابت است، مقدار هیوریستیک هر گره فقط یک بار محاسبه و ذخیره می‌شود
+        h_cache: Dict[Tuple[int, int], int] = {}
 
         # [تغییر ۱] یک شمارنده برای گره‌گشایی اضافه می‌کنیم
         tie_breaker_counter = 0
 
-        # [تغییر ۲] آیتم اولیه در صف اکنون شامل گره‌گشا است
-        frontier = [(0, tie_breaker_counter, start)]  # (priority, tie_breaker, position)
-        heapq.heapify(frontier)
+        # [تغییر ۲] صف شامل کلیدهای فشرده است؛ شمارنده بالای بیت‌های مختصات قرار دارد تا ترتیب FIFO حفظ شود
+        frontier = [((start.y + _COORD_BIAS) << 10) | (start.x + _COORD_BIAS)]
 
-        came_from: Dict[Position, Tuple[Position, Action]] = {start: None}
+        came_from: Dict[Tuple[int, int], Tuple[Tuple[int, int], Action]] = {start: None}
         cost_so_far = {start: 0}
 
-        iteration_limit = 200
+        iteration_limit = _ASTAR_ITER_LIMIT
         iteration_count = 0
 
         while frontier:
             iteration_count += 1
             if iteration_count > iteration_limit:
-                print(f"!!! A* Pathfinding Warning: Exceeded iteration limit from {start} to {goal}. Aborting.")
+                logger.debug("A* pathfinding exceeded iteration limit from %s to %s. Aborting.", start, goal)
                 return []
 
-            # [تغییر ۳] اکنون سه مقدار از صف خارج می‌شود
-            _, _, current_pos = heapq.heappop(frontier)
+            # [تغییر ۳] موقعیت از بیت‌های پایینی کلید فشرده بازیابی می‌شود
+            key = heapq.heappop(frontier)
+            cx = (key & _COORD_MASK) - _COORD_BIAS
+            cy = ((key >> 10) & _COORD_MASK) - _COORD_BIAS
+            current_pos = (cx, cy)
 
-            if current_pos == goal:
+            if cx == gx and cy == gy:
                 break
 
-            for direction in Direction:
-                action = self._direction_to_action(direction)
-                next_pos = current_pos + direction
-                if next_pos in walls:
+            new_cost = cost_so_far[current_pos] + 1
+            for (dx, dy), action in _DIR_MOVES:
+                nx, ny = cx + dx, cy + dy
+                next_pos = (nx, ny)
+                if nx < min_x or nx > max_x or ny < min_y or ny > max_y or next_pos in walls:
                     continue
 
-                new_cost = cost_so_far[current_pos] + 1
                 if next_pos not in cost_so_far or new_cost < cost_so_far[next_pos]:
                     cost_so_far[next_pos] = new_cost
-                    priority = new_cost + heuristic(next_pos, goal)
+                    h = h_cache.get(next_pos)
+                    if h is None:
+                        h = h_cache[next_pos] = abs(nx - gx) + abs(ny - gy)
+                    priority = new_cost + h
 
                     # [تغییر ۴] گره‌گشا را قبل از افزودن به صف افزایش می‌دهیم
                     tie_breaker_counter += 1
-                    heapq.heappush(frontier, (priority, tie_breaker_counter, next_pos))
+                    heapq.heappush(frontier, (priority << 40) | (tie_breaker_counter << 20)
+                                   | ((ny + _COORD_BIAS) << 10) | (nx + _COORD_BIAS))
 
                     came_from[next_pos] = (current_pos, action)
 
         if goal not in came_from:
             return []
 
-        path = []
+        # طول مسیر همان هزینه رسیدن به هدف است، پس لیست از قبل تخصیص یافته و از انتها پر می‌شود
+        n = cost_so_far[goal]
+        path = [None] * n
         temp = goal
-        while temp != start:
-            prev_pos, action = came_from[temp]
-            path.append(action)
-            temp = prev_pos
-        path.reverse()
+        for i in range(n - 1, -1, -1):
+            temp, path[i] = came_from[temp]
         return path
 
+    @staticmethod
+    def _find_path_astar_numba(start: Position, goal: Position, walls: Set[Position]) -> List[Action]:
+        """نسخه کامپایل‌شده A* که دیوارهای شناخته‌شده را به یک شبکه uint8 تبدیل کرده و به هسته numba می‌دهد."""
+        # شبکه دقیقاً همان کادر جستجوی نسخه پایتونی را پوشش می‌دهد
+        min_x, min_y, max_x, max_y = _astar_bounds(start, goal, walls)
+        grid = np.zeros((max_y - min_y + 1, max_x - min_x + 1), dtype=np.uint8)
+        for p in walls:
+            grid[p.y - min_y, p.x - min_x] = 1
+
+        codes = astar(grid, start.x - min_x, start.y - min_y, goal.x - min_x, goal.y - min_y, _ASTAR_ITER_LIMIT)
+        return [_DIR_ACTIONS[code] for code in codes.tolist()]
+
     # def _find_path_astar(self, start: Position, goal: Position, walls: Set[Position]) -> List[Action]:
     #     def heuristic(a: Position, b: Position) -> int:
     #         return abs(a.x - b.x) + abs(a.y - b.y)
@@ -0,0 +1,124 @@
+# astar_numba.py
+
+import numpy as np
+
+# numba یک وابستگی اختیاری است؛ اگر نصب نباشد، GoalBasedAgent از پیاده‌سازی پایتونی A* استفاده می‌کند.
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """جایگزین بی‌اثر njit تا این ماژول بدون numba هم قابل import باشد."""
+        def decorator(func):
+            return func
+        return decorator
+
+# کد هر جهت برابر ترتیب اعضای Direction است: شمال، جنوب، شرق، غرب
+_DX = np.array([0, 0, 1, -1], dtype=np.int32)
+_DY = np.array([-1, 1, 0, 0], dtype=np.int32)
+_INT32_MAX = 2147483647
+
+
+@njit(cache=True)
+def _heap_push(keys, packed, size, key, pos):
+    """یک عنصر را به هیپ دودویی (دو آرایه موازی کلید و موقعیت) اضافه می‌کند و اندازه جدید را برمی‌گرداند."""
+    i = size
+    while i > 0:
+        parent = (i - 1) >> 1
+        if keys[parent] <= key:
+            break
+        keys[i] = keys[parent]
+        packed[i] = packed[parent]
+        i = parent
+    keys[i] = key
+    packed[i] = pos
+    return size + 1
+
+
+@njit(cache=True)
+def _heap_pop(keys, packed, size):
+    """کوچک‌ترین عنصر هیپ را حذف می‌کند و (موقعیت فشرده، اندازه جدید) را برمی‌گرداند."""
+    top = packed[0]
+    size -= 1
+    key = keys[size]
+    pos = packed[size]
+    i = 0
+    while True:
+        child = 2 * i + 1
+        if child >= size:
+            break
+        if child + 1 < size and keys[child + 1] < keys[child]:
+            child += 1
+        if key <= keys[child]:
+            break
+        keys[i] = keys[child]
+        packed[i] = packed[child]
+        i = child
+    keys[i] = key
+    packed[i] = pos
+    return top, size
+
+
+@njit(cache=True)
+def astar(grid, sx, sy, gx, gy, iter_limit):
+    """
+    الگوریتم A* روی شبکه uint8 (خانه‌های غیرصفر دیوار هستند).
+    آرایه‌ای از کدهای جهت (int8) برمی‌گرداند؛ در صورت نبود مسیر یا عبور از سقف تکرار، آرایه خالی است.
+    """
+    height, width = grid.shape
+    cost_so_far = np.full((height, width), _INT32_MAX, dtype=np.int32)
+    came_from_dir = np.full((height, width), -1, dtype=np.int8)
+
+    # هر خروج از هیپ حداکثر چهار ورود جدید ایجاد می‌کند
+    capacity = 4 * iter_limit + 5
+    heap_keys = np.empty(capacity, dtype=np.int64)
+    heap_packed = np.empty(capacity, dtype=np.int32)
+
+    # کلید هیپ اولویت و شمارنده گره‌گشا را در یک عدد int64 کنار هم نگه می‌دارد
+    counter = 0
+    cost_so_far[sy, sx] = 0
+    size = _heap_push(heap_keys, heap_packed, 0, np.int64(0), sy * width + sx)
+
+    found = False
+    iteration_count = 0
+    while size > 0:
+        iteration_count += 1
+        if iteration_count > iter_limit:
+            return np.empty(0, dtype=np.int8)
+
+        current, size = _heap_pop(heap_keys, heap_packed, size)
+        cy = current // width
+        cx = current - cy * width
+        if cx == gx and cy == gy:
+            found = True
+            break
+
+        new_cost = cost_so_far[cy, cx] + 1
+        for d in range(4):
+            nx = cx + _DX[d]
+            ny = cy + _DY[d]
+            if nx < 0 or ny < 0 or nx >= width or ny >= height or grid[ny, nx] != 0:
+                continue
+            if new_cost < cost_so_far[ny, nx]:
+                cost_so_far[ny, nx] = new_cost
+                came_from_dir[ny, nx] = d
+                counter += 1
+                priority = new_cost + abs(nx - gx) + abs(ny - gy)
+                size = _heap_push(heap_keys, heap_packed, size,
+                                  (np.int64(priority) << 32) | counter, ny * width + nx)
+
+    if not found or (sx == gx and sy == gy):
+        return np.empty(0, dtype=np.int8)
+
+    # بازسازی مسیر از هدف به شروع با استفاده از جهت ورود به هر خانه
+    n = cost_so_far[gy, gx]
+    path = np.empty(n, dtype=np.int8)
+    x, y = gx, gy
+    for i in range(n - 1, -1, -1):
+        d = came_from_dir[y, x]
+        path[i] = d
+        x -= _DX[d]
+        y -= _DY[d]
+    return path
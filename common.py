@@ -1,11 +1,13 @@
 # common.py
 
-from enum import Enum
+import numpy as np
+from enum import Enum, IntEnum
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 # این شمارنده، انواع مختلف خانه‌های موجود در شبکه را تعریف می‌کند.
-class CellType(Enum):
+# از IntEnum استفاده می‌شود تا بتوان آن را مستقیماً با مقادیر آرایه شبکه مقایسه کرد.
+class CellType(IntEnum):
     EMPTY = 0
     WALL = 1
     GOAL = 2
@@ -20,19 +22,29 @@ class Direction(Enum):
     WEST = (-1, 0)
 
 # این شمارنده، تمام اقدامات ممکن برای یک عامل را تعریف می‌کند.
-class Action(Enum):
-    MOVE_NORTH = "MOVE_NORTH"
-    MOVE_SOUTH = "MOVE_SOUTH"
-    MOVE_EAST = "MOVE_EAST"
-    MOVE_WEST = "MOVE_WEST"
-    PICKUP = "PICKUP"
-    DROP = "DROP"
-    WAIT = "WAIT"
-
-# این دیتاکلاس، یک موقعیت (x, y) را در شبکه نمایندگی می‌کند.
-# استفاده از frozen=True آن را غیرقابل تغییر (immutable) می‌کند که برای استفاده به عنوان کلید دیکشنری مناسب است.
-@dataclass(frozen=True)
-class Position:
+# مقدار اقدام‌های حرکتی با ترتیب اعضای Direction یکسان است تا به عنوان اندیس آرایه قابل استفاده باشد.
+class Action(IntEnum):
+    MOVE_NORTH = 0
+    MOVE_SOUTH = 1
+    MOVE_EAST = 2
+    MOVE_WEST = 3
+    PICKUP = 4
+    DROP = 5
+    WAIT = 6
+
+# نگاشت مستقیم جهت به اقدام حرکتی و برعکس، به جای ساختن نام اقدام از روی رشته
+DIR_TO_ACTION: Dict[Direction, Action] = {
+    Direction.NORTH: Action.MOVE_NORTH,
+    Direction.SOUTH: Action.MOVE_SOUTH,
+    Direction.EAST: Action.MOVE_EAST,
+    Direction.WEST: Action.MOVE_WEST,
+}
+ACTION_TO_DIR: Dict[Action, Direction] = {action: direction for direction, action in DIR_TO_ACTION.items()}
+
+# این کلاس، یک موقعیت (x, y) را در شبکه نمایندگی می‌کند.
+# به صورت NamedTuple تعریف شده تا غیرقابل تغییر باشد و هش و مقایسه آن از پیاده‌سازی C تاپل استفاده کند؛
+# بنابراین یک تاپل ساده (x, y) نیز به عنوان کلید دیکشنری یا مجموعه با آن معادل است.
+class Position(NamedTuple):
     x: int
     y: int
 
@@ -50,6 +62,8 @@ class Perception:
     energy_level: float
     has_resource: bool
     messages: List
+    # پنجره خام دید به صورت آرایه uint8 (اندیس [y, x]) تا عامل‌ها بدون ساخت دیکشنری از آن استفاده کنند
+    visible_window: Optional[np.ndarray] = None
 
 # این دیتاکلاس، یک گام از برنامه یک عامل مبتنی بر هدف را نمایندگی می‌کند.
 @dataclass
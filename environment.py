@@ -1,17 +1,31 @@
 # environment.py
 
+import logging
 import numpy as np
-from collections import defaultdict
-from typing import Dict, List, TYPE_CHECKING
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Optional, Set, TYPE_CHECKING
 
 # وارد کردن کلاس‌های داده‌ای مورد نیاز از ماژول مشترک
-from common import CellType, Position, Action, Perception, Direction
+from common import CellType, Position, Action, Perception, ACTION_TO_DIR
 
 # این یک تکنیک استاندارد در پایتون برای جلوگیری از خطای وابستگی دایره‌ای (Circular Dependency) است.
 # چون environment به Agent نیاز دارد و agents نیز به Perception نیاز دارد که در environment تعریف می‌شود.
 if TYPE_CHECKING:
     from agents import Agent
 
+logger = logging.getLogger(__name__)
+
+# نگاشت مقدار عددی ذخیره‌شده در آرایه شبکه به نوع خانه متناظر
+_CELL_BY_VALUE = {cell.value: cell for cell in CellType}
+
+# نتیجه رها کردن منبع بر اساس نوع خانه‌ای که عامل روی آن ایستاده است
+_DROP_OUTCOME = {
+    CellType.GOAL.value: 'deliver',  # تحویل منبع و تکمیل وظیفه
+    CellType.EMPTY.value: 'drop',  # منبع روی زمین می‌افتد
+    CellType.RESOURCE.value: 'drop',
+    CellType.HAZARD.value: 'drop',
+}
+
 
 class GridWorld:
     """
@@ -26,40 +40,68 @@ class GridWorld:
         self.perception_range = perception_range
         self.time_step = 0
 
+        # جابه‌جایی‌های (dx, dy) پنجره دید به ترتیب سطری، یک بار محاسبه می‌شوند
+        self._offset_list = [(dx, dy) for dy in range(-perception_range, perception_range + 1)
+                             for dx in range(-perception_range, perception_range + 1)]
+
         # ساختارهای داده برای نگهداری وضعیت محیط
-        self.grid: Dict[Position, CellType] = defaultdict(lambda: CellType.EMPTY)
+        # شبکه به صورت آرایه دوبعدی uint8 با اندیس [y, x] که مقدار CellType هر خانه را نگه می‌دارد.
+        # شبکه نمایی از داخل یک آرایه بزرگ‌تر است که حاشیه‌ای از دیوار به پهنای برد دید دارد،
+        # بنابراین _windows[y, x] همیشه پنجره دید به‌روز عاملی است که در (x, y) قرار دارد.
+        r = perception_range
+        self._padded = np.full((height + 2 * r, width + 2 * r), CellType.WALL.value, dtype=np.uint8)
+        self._padded[r:r + height, r:r + width] = CellType.EMPTY.value
+        self.grid: np.ndarray = self._padded[r:r + height, r:r + width]
+        self._windows = sliding_window_view(self._padded, (2 * r + 1, 2 * r + 1))
+        # با هر تغییر شبکه در حین اجرا افزایش می‌یابد تا پنجره‌های دسته‌ای کهنه تشخیص داده شوند
+        self._grid_version = 0
         self.agents: Dict[int, 'Agent'] = {}
         self.agent_positions: Dict[int, Position] = {}
+        # مجموعه خانه‌های اشغال‌شده توسط عامل‌ها برای بررسی O(1) آزاد بودن یک خانه
+        self._occupied: Set[Position] = set()
 
         # متریک‌های عملکرد برای ارزیابی
         self.initial_resource_count = 0
         self.tasks_completed = 0
-        self.task_completion_times: List[int] = []
+        # زمان‌های تکمیل وظیفه در یک بافر int32 از پیش تخصیص‌یافته ثبت می‌شوند
+        self._completion_buf = np.empty(16, dtype=np.int32)
+        self._completion_len = 0
+
+    @property
+    def task_completion_times(self) -> np.ndarray:
+        """نمایی از زمان‌های ثبت‌شده تکمیل وظیفه."""
+        return self._completion_buf[:self._completion_len]
 
     def add_walls(self, wall_positions: List[Position]):
         """دیوارها را به محیط اضافه می‌کند."""
         for pos in wall_positions:
             if self.is_valid_position(pos):
-                self.grid[pos] = CellType.WALL
+                self.grid[pos.y, pos.x] = CellType.WALL.value
+
+    def add_walls_array(self, coords: np.ndarray):
+        """دیوارها را از یک آرایه (K, 2) مختصات (x, y) با یک انتساب برداری به محیط اضافه می‌کند."""
+        xs, ys = coords[:, 0], coords[:, 1]
+        valid = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        self.grid[ys[valid], xs[valid]] = CellType.WALL.value
 
     def add_goals(self, goal_positions: List[Position]):
         """اهداف را به محیط اضافه می‌کند."""
         for pos in goal_positions:
             if self.is_valid_position(pos):
-                self.grid[pos] = CellType.GOAL
+                self.grid[pos.y, pos.x] = CellType.GOAL.value
 
     def add_resources(self, resource_positions: List[Position]):
         """منابع را به محیط اضافه می‌کند."""
         for pos in resource_positions:
             if self.is_valid_position(pos):
-                self.grid[pos] = CellType.RESOURCE
+                self.grid[pos.y, pos.x] = CellType.RESOURCE.value
         self.initial_resource_count = len(resource_positions)
 
     def add_hazards(self, hazard_positions: List[Position]):
         """خطرات را به محیط اضافه می‌کند."""
         for pos in hazard_positions:
             if self.is_valid_position(pos):
-                self.grid[pos] = CellType.HAZARD
+                self.grid[pos.y, pos.x] = CellType.HAZARD.value
 
     def add_agent(self, agent: 'Agent', position: Position) -> bool:
         """یک عامل جدید را به محیط اضافه می‌کند."""
@@ -68,6 +110,7 @@ class GridWorld:
             agent.agent_id = agent_id
             self.agents[agent_id] = agent
             self.agent_positions[agent_id] = position
+            self._occupied.add(position)
             return True
         return False
 
@@ -77,32 +120,33 @@ class GridWorld:
 
     def is_position_free(self, pos: Position) -> bool:
         """بررسی می‌کند که آیا یک موقعیت برای قرارگیری عامل آزاد است (دیوار یا عامل دیگری نباشد)."""
-        is_wall = self.grid.get(pos) == CellType.WALL
-        is_occupied = pos in self.agent_positions.values()
-        return self.is_valid_position(pos) and not is_wall and not is_occupied
+        return (self.is_valid_position(pos) and self.grid[pos.y, pos.x] != CellType.WALL.value
+                and pos not in self._occupied)
 
-    def get_perception(self, agent_id: int) -> Perception:
-        """ادراک محلی را برای یک عامل مشخص تولید می‌کند."""
+    def get_perception(self, agent_id: int, window: Optional[np.ndarray] = None) -> Perception:
+        """ادراک محلی را برای یک عامل مشخص تولید می‌کند (پنجره دید می‌تواند از قبل به صورت دسته‌ای برداشته شده باشد)."""
         agent_pos = self.agent_positions[agent_id]
         agent = self.agents[agent_id]
-        visible_cells: Dict[Position, CellType] = {}
-
-        # ایجاد محدوده دید 5x5
-        for y_offset in range(-self.perception_range, self.perception_range + 1):
-            for x_offset in range(-self.perception_range, self.perception_range + 1):
-                pos = Position(agent_pos.x + x_offset, agent_pos.y + y_offset)
-                if not self.is_valid_position(pos):
-                    visible_cells[pos] = CellType.WALL
-                else:
-                    visible_cells[pos] = self.grid.get(pos, CellType.EMPTY)
+        ax, ay = agent_pos.x, agent_pos.y
+
+        # پنجره دید 5x5 از شبکه حاشیه‌دار برداشته می‌شود؛ خانه‌های خارج از شبکه دیوار هستند
+        if window is None:
+            window = self._windows[ay, ax].copy()
+
+        # دیکشنری خانه‌های قابل مشاهده برای سازگاری با عامل‌های موجود ساخته می‌شود
+        visible_cells: Dict[Position, CellType] = {
+            Position(ax + dx, ay + dy): _CELL_BY_VALUE[value]
+            for (dx, dy), value in zip(self._offset_list, window.ravel().tolist())
+        }
 
         return Perception(
             position=agent_pos,
             visible_cells=visible_cells,
             visible_agents={},  # برای سادگی، این بخش پیاده‌سازی نشده است
             energy_level=agent.total_rewards,
-            has_resource=(agent.action_history.count(Action.PICKUP) > agent.action_history.count(Action.DROP)),
-            messages=[]  # برای سادگی، این بخش پیاده‌سازی نشده است
+            has_resource=agent.carrying,
+            messages=[],  # برای سادگی، این بخش پیاده‌سازی نشده است
+            visible_window=window,
         )
 
     def execute_action(self, agent_id: int, action: Action):
@@ -111,43 +155,90 @@ class GridWorld:
         current_pos = self.agent_positions[agent_id]
         agent.total_rewards -= 1  # کسر انرژی برای هر اقدام
 
-        if action.name.startswith("MOVE"):
-            direction = Direction[action.name.replace("MOVE_", "")]
+        direction = ACTION_TO_DIR.get(action)
+        if direction is not None:
             next_pos = current_pos + direction
             if self.is_position_free(next_pos):
+                self._occupied.discard(current_pos)
+                self._occupied.add(next_pos)
                 self.agent_positions[agent_id] = next_pos
 
         elif action == Action.PICKUP:
-            if self.grid.get(current_pos) == CellType.RESOURCE:
-                agent.action_history.append(Action.PICKUP)
-                self.grid[current_pos] = CellType.EMPTY
+            # هر عامل در هر لحظه فقط یک منبع حمل می‌کند
+            if not agent.carrying and self.grid[current_pos.y, current_pos.x] == CellType.RESOURCE.value:
+                agent.carrying = True
+                agent.record_action(Action.PICKUP)
+                self.grid[current_pos.y, current_pos.x] = CellType.EMPTY.value
+                self._grid_version += 1
 
         elif action == Action.DROP:
-            if (agent.action_history.count(Action.PICKUP) > agent.action_history.count(Action.DROP)):
-                agent.action_history.append(Action.DROP)
-                if self.grid.get(current_pos) == CellType.GOAL:
+            if agent.carrying:
+                agent.carrying = False
+                agent.record_action(Action.DROP)
+                if _DROP_OUTCOME[self.grid[current_pos.y, current_pos.x]] == 'deliver':
                     self.tasks_completed += 1
-                    self.task_completion_times.append(self.time_step)  # ثبت زمان تکمیل وظیفه
-                    print(f"Agent {agent_id} delivered a resource at {current_pos}!")
+                    # ثبت زمان تکمیل وظیفه (در صورت پر شدن، بافر دو برابر می‌شود)
+                    if self._completion_len == len(self._completion_buf):
+                        self._completion_buf = np.concatenate([self._completion_buf, np.empty_like(self._completion_buf)])
+                    self._completion_buf[self._completion_len] = self.time_step
+                    self._completion_len += 1
+                    logger.debug("Agent %s delivered a resource at %s!", agent_id, current_pos)
                 else:
-                    self.grid[current_pos] = CellType.RESOURCE  # منبع روی زمین می‌افتد
+                    self.grid[current_pos.y, current_pos.x] = CellType.RESOURCE.value  # منبع روی زمین می‌افتد
+                    self._grid_version += 1
 
         elif action == Action.WAIT:
             agent.total_rewards += 0.5  # بازیابی بخشی از انرژی
 
-    def step(self):
-        """یک گام کامل شبیه‌سازی را برای همه عامل‌ها اجرا می‌کند."""
+    def step(self) -> bool:
+        """
+        یک گام کامل شبیه‌سازی را برای همه عامل‌ها اجرا می‌کند.
+        اگر پس از این گام انرژی همه عامل‌ها تمام شده باشد True (پایان شبیه‌سازی) برمی‌گرداند.
+        """
+        active = [agent_id for agent_id, agent in self.agents.items() if agent.total_rewards > 0]
+        return not self._tick(active)
+
+    def _tick(self, active: List[int]) -> List[int]:
+        """
+        یک گام را برای عامل‌های فعال اجرا می‌کند و عامل‌هایی را که پس از آن هنوز انرژی دارند برمی‌گرداند.
+        انرژی هر عامل فقط با اقدام خودش تغییر می‌کند، پس عامل بی‌انرژی دیگر فعال نمی‌شود.
+        """
         self.time_step += 1
-        for agent_id, agent in self.agents.items():
-            if agent.total_rewards <= 0:
-                continue
-            perception = self.get_perception(agent_id)
-            action, reason = agent.decide_action(perception)
+        if not active:
+            return active
+
+        # پنجره دید همه عامل‌ها با یک اندیس‌گذاری برداری روی نمای پنجره‌های لغزان برداشته می‌شود
+        coords = np.array([(self.agent_positions[i].x, self.agent_positions[i].y) for i in active], dtype=np.intp)
+        windows = self._windows[coords[:, 1], coords[:, 0]]
+        grid_version = self._grid_version
+
+        for agent_id, window in zip(active, windows):
+            # اگر عامل قبلی در همین گام شبکه را تغییر داده باشد، پنجره از نو خوانده می‌شود
+            if self._grid_version != grid_version:
+                window = None
+            perception = self.get_perception(agent_id, window)
+            action, reason = self.agents[agent_id].decide_action(perception)
             self.execute_action(agent_id, action)
 
+        return [agent_id for agent_id in active if self.agents[agent_id].total_rewards > 0]
+
+    def run(self, max_steps: int):
+        """
+        شبیه‌سازی را حداکثر به اندازه max_steps گام اجرا می‌کند و زودتر متوقف می‌شود اگر انرژی همه عامل‌ها تمام شده باشد.
+        حلقه گام‌ها به جای فراخواننده در خود محیط اجرا می‌شود تا جستجوی متدها و ویژگی‌ها یک بار انجام شود.
+        """
+        # فهرست عامل‌های فعال بین گام‌ها حفظ و فقط هرس می‌شود، به جای پیمایش دوباره همه عامل‌ها در هر گام
+        tick = self._tick
+        active = [agent_id for agent_id, agent in self.agents.items() if agent.total_rewards > 0]
+        for _ in range(max_steps):
+            active = tick(active)
+            if not active:
+                break
+
     def get_performance_metrics(self) -> Dict[str, float]:
         """متریک‌های نهایی عملکرد را برای تحلیل محاسبه و برمی‌گرداند."""
-        final_task_completion_time = max(self.task_completion_times) if self.task_completion_times else 0
+        completion_times = self.task_completion_times
+        final_task_completion_time = completion_times.max() if len(completion_times) else 0
         return {
             'total_resources_collected': self.tasks_completed,
             'time_step': self.time_step,
@@ -1,21 +1,59 @@
 # main.py
 
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+
 # وارد کردن کلاس تستر از ماژول مربوطه
 from tester import ProjectTester
 
 
+def _install_queue_logging(log_queue):
+    """
+    تمام لاگ‌های پردازه فعلی را به صف مشترک می‌فرستد (در پردازه اصلی و به عنوان initializer هر worker).
+    """
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    # لاگ‌های سطح DEBUG مسیرهای داغ شبیه‌سازی به صورت پیش‌فرض خاموش هستند
+    root.setLevel(logging.WARNING)
+
+
 def main():
     """
     تابع اصلی برنامه که فرآیند اجرای آزمایش‌ها را آغاز می‌کند.
     """
+    # نوشتن لاگ‌ها روی stderr در یک رشته پس‌زمینه (QueueListener) انجام می‌شود تا I/O حلقه ارسال اجراها را متوقف نکند
+    log_queue = multiprocessing.Queue()
+    listener = QueueListener(log_queue, logging.StreamHandler())
+    # پیکربندی قبلی لاگ‌ها ذخیره می‌شود تا پس از توقف listener بازگردانده شود
+    root = logging.getLogger()
+    tester_logger = logging.getLogger("tester")
+    saved_handlers, saved_level, saved_tester_level = root.handlers[:], root.level, tester_logger.level
+    _install_queue_logging(log_queue)
+    # پیام‌های پیشرفت تستر در سطح INFO نمایش داده می‌شوند
+    tester_logger.setLevel(logging.INFO)
+    listener.start()
+
     print("Multi-Agent Systems Project - Simulation Runner")
     print("=================================================")
 
-    # یک نمونه از کلاس تستر ایجاد می‌کنیم
-    tester = ProjectTester()
+    try:
+        # اجراهای مستقل آزمایش‌ها در یک ProcessPoolExecutor (به تعداد هسته‌های پردازنده) انجام می‌شوند
+        with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_install_queue_logging,
+                                 initargs=(log_queue,)) as executor:
+            # یک نمونه از کلاس تستر ایجاد می‌کنیم
+            tester = ProjectTester(executor)
 
-    # متد مقایسه را برای اجرای تمام آزمایش‌ها و ذخیره نتایج فراخوانی می‌کنیم
-    tester.run_comparison()
+            # متد مقایسه را برای اجرای تمام آزمایش‌ها و ذخیره نتایج فراخوانی می‌کنیم
+            tester.run_comparison()
+    finally:
+        # باقی‌مانده صف پیش از پیام‌های پایانی نوشته می‌شود و سپس لاگ‌ها دوباره مستقیماً به handlerهای قبلی می‌روند
+        listener.stop()
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+        tester_logger.setLevel(saved_tester_level)
 
     print("\n✓ Simulation complete! Results saved to 'experimental_results.csv'.")
     print("You can now run 'analysis.py' to generate the final plots.")
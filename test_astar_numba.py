@@ -0,0 +1,53 @@
+# test_astar_numba.py
+
+import random
+import unittest
+from unittest import mock
+
+import agents
+from agents import GoalBasedAgent
+from astar_numba import NUMBA_AVAILABLE, astar
+from common import Position
+
+
+def _random_cases(count: int, seed: int = 0):
+    """شبکه‌های تصادفی ثابت با تراکم‌های مختلف دیوار به همراه شروع و هدف تولید می‌کند."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        size = rng.randint(3, 14)
+        density = rng.choice((0.05, 0.15, 0.3, 0.5))
+        walls = {Position(x, y) for x in range(size) for y in range(size) if rng.random() < density}
+        start = Position(rng.randrange(size), rng.randrange(size))
+        goal = Position(rng.randrange(size), rng.randrange(size))
+        walls.discard(start)
+        yield start, goal, walls
+
+
+class AstarKernelEquivalenceTest(unittest.TestCase):
+    """هسته A* ماژول astar_numba باید دقیقاً همان مسیر A* پایتونی GoalBasedAgent را برگرداند."""
+
+    def _assert_matches_python(self):
+        for start, goal, walls in _random_cases(1000):
+            with self.subTest(start=start, goal=goal, walls=sorted(walls)):
+                self.assertEqual(GoalBasedAgent._find_path_astar_numba(start, goal, walls),
+                                 GoalBasedAgent._find_path_astar_python(start, goal, walls))
+
+    def test_uncompiled_kernel_matches_python(self):
+        # بدون numba، astar خود تابع پایتونی است؛ با numba، py_func نسخه کامپایل‌نشده آن است
+        with mock.patch.object(agents, "astar", getattr(astar, "py_func", astar)):
+            self._assert_matches_python()
+
+    @unittest.skipUnless(NUMBA_AVAILABLE, "numba is not installed")
+    def test_compiled_kernel_matches_python(self):
+        self._assert_matches_python()
+
+
+class AstarBoundsTest(unittest.TestCase):
+
+    def test_search_box_outside_packed_range_is_rejected(self):
+        with self.assertRaises(ValueError):
+            GoalBasedAgent._find_path_astar_python(Position(0, 0), Position(3, 3), {Position(511, 2)})
+
+
+if __name__ == "__main__":
+    unittest.main()
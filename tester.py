@@ -1,19 +1,29 @@
 # tester.py
 
 import csv
+import functools
+import logging
+import random
 import numpy as np
+from concurrent.futures import Executor
 from dataclasses import dataclass
-from typing import Dict, Type
+from itertools import islice, repeat
+from typing import Dict, Iterable, List, Optional, Tuple, Type
 
 # وارد کردن کلاس‌های مورد نیاز از ماژول‌های دیگر پروژه
 from common import Position
 from environment import GridWorld
 from agents import Agent, SimpleReflexAgent, ModelBasedReflexAgent, GoalBasedAgent
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class ExperimentConfig:
-    """دیتاکلاسی برای نگهداری پیکربندی هر سناریوی آزمایشی."""
+    """
+    دیتاکلاسی برای نگهداری پیکربندی هر سناریوی آزمایشی.
+    پیکربندی پس از ساخت تغییر نمی‌کند؛ frozen آن را hashable می‌کند و slots دسترسی به فیلدها را سریع‌تر می‌کند.
+    """
     name: str
     grid_size: tuple[int, int]
     num_agents: int
@@ -22,6 +32,82 @@ class ExperimentConfig:
     num_hazards: int
     max_steps: int
     num_trials: int = 5  # طبق نیازمندی پروژه، هر آزمایش ۵ بار تکرار می‌شود
+    seed: int = 0  # بذر ریشه که جریان‌های تصادفی مستقل همه اجراهای این سناریو از آن مشتق می‌شوند (برای هر سناریو متفاوت)
+
+
+def _trial_seed_sequence(config: ExperimentConfig, trial_idx: int) -> np.random.SeedSequence:
+    """
+    جریان تصادفی اجرای trial_idx را از بذر ریشه سناریو مشتق می‌کند (معادل jax.random.split).
+    فرزند i ام یک SeedSequence مستقل از بقیه است و به پردازه یا ترتیب اجرا بستگی ندارد.
+    """
+    return np.random.SeedSequence(config.seed, spawn_key=(trial_idx,))
+
+
+# ستون‌های فایل نتایج به ترتیب کلیدهای دیکشنری خروجی ProjectTester._summarize
+_RESULT_FIELDS = ["config_name", "agent_type", "avg_tasks_completed", "avg_completion_time", "num_trials"]
+
+
+@functools.lru_cache(maxsize=None)
+def _layout_for(grid_size: Tuple[int, int]) -> Tuple[np.ndarray, Tuple[Position, ...], Tuple[Position, ...]]:
+    """
+    چیدمان ثابت (دیوارها، منابع، اهداف) را برای یک اندازه شبکه می‌سازد.
+    چیدمان فقط به اندازه شبکه وابسته است، پس در هر پردازه یک بار ساخته و برای همه اجراها دوباره استفاده می‌شود.
+    """
+    width, height = grid_size
+
+    # (در یک پروژه واقعی، این بخش باید به صورت دینامیک دیوارها و ... را بسازد)
+    # در اینجا برای سادگی از یک نمونه ثابت استفاده می‌کنیم
+    # دیوارهای مرزی به صورت یک آرایه (K, 2) از مختصات (x, y) ساخته می‌شوند، نه K شیء Position
+    xs = np.arange(width, dtype=np.int32)
+    ys = np.arange(height, dtype=np.int32)
+    walls = np.concatenate([
+        np.column_stack([xs, np.zeros_like(xs)]),
+        np.column_stack([xs, np.full_like(xs, height - 1)]),
+        np.column_stack([np.zeros_like(ys), ys]),
+        np.column_stack([np.full_like(ys, width - 1), ys]),
+    ])
+    walls.setflags(write=False)  # آرایه کش‌شده بین اجراها مشترک است
+
+    # این مقادیر باید بر اساس config تنظیم شوند، اما برای سادگی ثابت در نظر گرفته شده‌اند
+    resources = (Position(3, 3), Position(5, 5))
+    goals = (Position(2, 2), Position(6, 6))
+    return walls, resources, goals
+
+
+def _run_trial(agent_class: Type[Agent], config: ExperimentConfig, trial_idx: int) -> Tuple[float, int]:
+    """
+    یک اجرای مستقل از یک آزمایش را انجام داده و (زمان تکمیل وظیفه، تعداد وظایف تکمیل‌شده) را برمی‌گرداند.
+    این تابع در سطح ماژول تعریف شده تا برای اجرا در ProcessPoolExecutor قابل pickle باشد.
+    """
+    # بذر تصادفی هر اجرا ثابت است تا نتایج مستقل از نحوه تقسیم اجراها بین پردازه‌ها قابل تکرار باشند.
+    # همه انواع عامل در اجرای i ام از یک جریان استفاده می‌کنند تا مقایسه آن‌ها منصفانه باشد.
+    seed_seq = _trial_seed_sequence(config, trial_idx)
+    random.seed(int(seed_seq.generate_state(1)[0]))
+
+    # فیلدهای پرکاربرد پیکربندی یک بار در متغیرهای محلی خوانده می‌شوند
+    grid_size = config.grid_size
+    width, height = grid_size
+    max_steps = config.max_steps
+
+    # برای هر اجرا، یک محیط و عامل جدید می‌سازیم تا نتایج مستقل باشند
+    env = GridWorld(width, height)
+
+    walls, resources, goals = _layout_for(grid_size)
+    env.add_walls_array(walls)
+    env.add_resources(resources)
+    env.add_goals(goals)
+
+    # نام عامل فقط برای شناسایی است؛ برای هر اجرا نام جدیدی ساخته نمی‌شود. عامل تازه ساخته‌شده نیازی به reset ندارد.
+    agent = agent_class(agent_class.__name__)
+    # عامل در هر گام حداکثر یک عدد تصادفی مصرف می‌کند، پس max_steps عدد یک‌جا با PCG64 تولید می‌شوند
+    agent.set_random_pool(np.random.default_rng(seed_seq).random(max_steps, dtype=np.float32))
+    env.add_agent(agent, Position(1, 1))
+
+    # اجرای گام‌های شبیه‌سازی
+    env.run(max_steps)
+
+    metrics = env.get_performance_metrics()
+    return metrics['task_completion_time'], metrics['total_resources_collected']
 
 
 class ProjectTester:
@@ -29,8 +115,13 @@ class ProjectTester:
     این کلاس مسئولیت کامل اجرای آزمایش‌ها و جمع‌آوری نتایج را بر عهده دارد.
     """
 
-    def __init__(self):
-        """تعریف سناریوهای آزمایشی و انواع عامل‌ها."""
+    def __init__(self, executor: Optional[Executor] = None):
+        """
+        تعریف سناریوهای آزمایشی و انواع عامل‌ها.
+        در صورت ارسال یک Executor (مثلاً ProcessPoolExecutor)، اجراهای هر آزمایش به صورت موازی در آن انجام می‌شوند
+        و همان پردازه‌ها برای تمام آزمایش‌ها دوباره استفاده می‌شوند.
+        """
+        self.executor = executor
         self.experiment_configs = [
             ExperimentConfig(
                 name="simple_collection",
@@ -40,6 +131,7 @@ class ProjectTester:
                 num_goals=2,
                 num_hazards=0,
                 max_steps=200,
+                seed=0,
             ),
             ExperimentConfig(
                 name="maze_navigation",
@@ -49,6 +141,7 @@ class ProjectTester:
                 num_goals=2,
                 num_hazards=3,
                 max_steps=300,
+                seed=1,
             ),
             ExperimentConfig(
                 name="competitive_collection",
@@ -58,6 +151,7 @@ class ProjectTester:
                 num_goals=2,
                 num_hazards=2,
                 max_steps=400,
+                seed=2,
             )
         ]
 
@@ -67,73 +161,70 @@ class ProjectTester:
             "GoalBasedAgent": GoalBasedAgent
         }
 
+    def _map(self, func, *iterables) -> Iterable:
+        """تابع را روی ورودی‌ها اجرا می‌کند؛ در صورت وجود executor به صورت موازی و در غیر این صورت به ترتیب."""
+        mapper = self.executor.map if self.executor is not None else map
+        return mapper(func, *iterables)
+
     def run_single_experiment(self, agent_class: Type[Agent], config: ExperimentConfig) -> Dict:
         """یک آزمایش کامل را برای یک عامل و یک سناریو با چندین بار تکرار اجرا می‌کند."""
-        completion_times = []
-        tasks_completed_list = []
-
-        for i in range(config.num_trials):
-            # برای هر اجرا، یک محیط و عامل جدید می‌سازیم تا نتایج مستقل باشند
-            env = GridWorld(config.grid_size[0], config.grid_size[1])
-
-            # (در یک پروژه واقعی، این بخش باید به صورت دینامیک دیوارها و ... را بسازد)
-            # در اینجا برای سادگی از یک نمونه ثابت استفاده می‌کنیم
-            walls = [Position(x, 0) for x in range(env.width)] + [Position(x, env.height - 1) for x in range(env.width)]
-            walls += [Position(0, y) for y in range(env.height)] + [Position(env.width - 1, y) for y in
-                                                                    range(env.height)]
-            env.add_walls(walls)
-
-            # این مقادیر باید بر اساس config تنظیم شوند، اما برای سادگی ثابت در نظر گرفته شده‌اند
-            resources = [Position(3, 3), Position(5, 5)]
-            goals = [Position(2, 2), Position(6, 6)]
-            env.add_resources(resources)
-            env.add_goals(goals)
-
-            agent = agent_class(f"{agent_class.__name__}_trial_{i}")
-            agent.reset()
-            env.add_agent(agent, Position(1, 1))
-
-            # اجرای گام‌های شبیه‌سازی
-            for _ in range(config.max_steps):
-                if agent.total_rewards <= 0: break
-                env.step()
-
-            metrics = env.get_performance_metrics()
-            completion_times.append(metrics['task_completion_time'])
-            tasks_completed_list.append(metrics['total_resources_collected'])
+        # اجراهای یک آزمایش مستقل از هم هستند و در صورت وجود executor به صورت موازی اجرا می‌شوند
+        trial_results = self._map(_run_trial, repeat(agent_class), repeat(config), range(config.num_trials))
+        return self._summarize(agent_class, config, list(trial_results))
+
+    def _summarize(self, agent_class: Type[Agent], config: ExperimentConfig,
+                   trial_results: List[Tuple[float, int]]) -> Dict:
+        """نتایج اجراهای یک آزمایش را به متریک‌های میانگین تبدیل می‌کند."""
+        # آرایه‌های از پیش تخصیص‌یافته به جای لیست، تا میانگین‌گیری بدون تبدیل لیست به آرایه انجام شود
+        completion_times = np.empty(config.num_trials, dtype=np.float64)
+        tasks_completed = np.empty(config.num_trials, dtype=np.float64)
+        for i, (completion_time, num_tasks) in enumerate(trial_results):
+            completion_times[i] = completion_time
+            tasks_completed[i] = num_tasks
 
         # محاسبه میانگین نتایج پس از تمام تکرارها
         # اگر در هیچ اجرایی وظیفه انجام نشود، زمان تکمیل صفر خواهد بود
-        valid_completion_times = [t for t in completion_times if t > 0]
-        avg_completion_time = np.mean(valid_completion_times) if valid_completion_times else 0
+        valid = completion_times > 0
+        avg_completion_time = completion_times[valid].mean() if valid.any() else 0.0
 
         return {
             "config_name": config.name,
             "agent_type": agent_class.__name__,
-            "avg_tasks_completed": np.mean(tasks_completed_list),
+            "avg_tasks_completed": tasks_completed.mean(),
             "avg_completion_time": avg_completion_time,
             "num_trials": config.num_trials
         }
 
     def run_comparison(self):
-        """تمام آزمایش‌ها را اجرا کرده و نتایج نهایی را در فایل CSV ذخیره می‌کند."""
-        all_results = []
-
-        for config in self.experiment_configs:
-            for agent_name, agent_class in self.agent_types.items():
-                print(f"\nRunning experiment for '{agent_name}' in '{config.name}'...")
-
-                final_metrics = self.run_single_experiment(agent_class, config)
-                all_results.append(final_metrics)
-
-                print(f"✓ Experiment for '{agent_name}' in '{config.name}' completed.")
-
-        # ذخیره نتایج در فایل CSV
-        if all_results:
-            output_file = "experimental_results.csv"
-            print(f"\nSaving final results to {output_file}...")
-            with open(output_file, 'w', newline='') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=all_results[0].keys())
-                writer.writeheader()
-                writer.writerows(all_results)
-            print("✓ Results saved.")
\ No newline at end of file
+        """تمام آزمایش‌ها را اجرا کرده و نتیجه هر آزمایش را بلافاصله پس از پایان آن در فایل CSV ذخیره می‌کند."""
+        output_file = "experimental_results.csv"
+
+        # تمام اجراهای همه آزمایش‌ها (سناریو × عامل × تکرار) یک‌جا به executor سپرده می‌شوند
+        # تا پردازه‌ها به جای انتظار برای پایان هر آزمایش، همیشه کار داشته باشند
+        experiments = [(config, agent_name, agent_class)
+                       for config in self.experiment_configs
+                       for agent_name, agent_class in self.agent_types.items()]
+        trials = [(agent_class, config, i)
+                  for config, _, agent_class in experiments
+                  for i in range(config.num_trials)]
+        # ستون‌ها جداگانه ساخته می‌شوند تا با لیست خالی اجراها هم map حداقل یک iterable دریافت کند
+        trial_results = iter(self._map(_run_trial, [trial[0] for trial in trials],
+                                       [trial[1] for trial in trials], [trial[2] for trial in trials]))
+
+        # هر ردیف به محض آماده شدن نوشته و flush می‌شود تا نتایج جزئی در صورت توقف اجرا از دست نروند
+        with open(output_file, 'w', newline='', buffering=8192) as csvfile:
+            # csv.writer مستقیماً تاپل‌ها را در C قالب‌بندی می‌کند و نگاشت کلیدهای DictWriter را ندارد
+            writer = csv.writer(csvfile)
+            writer.writerow(_RESULT_FIELDS)
+
+            # نتایج به همان ترتیب ارسال برمی‌گردند، پس هر آزمایش num_trials نتیجه بعدی را برمی‌دارد
+            for config, agent_name, agent_class in experiments:
+                logger.info("Running experiment for '%s' in '%s'...", agent_name, config.name)
+
+                final_metrics = self._summarize(agent_class, config, list(islice(trial_results, config.num_trials)))
+                writer.writerow(tuple(final_metrics[field] for field in _RESULT_FIELDS))
+                csvfile.flush()
+
+                logger.info("✓ Experiment for '%s' in '%s' completed.", agent_name, config.name)
+
+        logger.info("✓ Results saved to %s.", output_file)
\ No newline at end of file